@@ -4,68 +4,159 @@ import arcade.gui
 import ast
 import os
 import json
+import copy
+import bisect
+import functools
+import collections
+import sys
+import concurrent.futures
+
+try:
+    import orjson  # optional, faster JSON parsing in load_ddsl_files
+except ImportError:
+    orjson = None
+
+
+_DSL_FILE_CACHE = {}  # file path -> (st_mtime_ns, file content)
+_DDSL_CACHE = {}  # main.ddsl path -> (st_mtime_ns, parsed variables)
+_STYLE_CACHE = {}  # frozen UIStyle kwargs (None = default style) -> {state: UIStyle}
+
+# DSL tokenizer: identifiers, quoted strings, // comments, punctuation,
+# and runs of any other non-space characters (10%w, -2.5, <<var>>, ...);
+# a lone "/" or quote that starts nothing above is its own token
+_TOKEN_RE = re.compile(r"([A-Za-z_]\w*)|('[^'\\]*(?:\\.[^'\\]*)*')|(\"[^\"\\]*(?:\\.[^\"\\]*)*\")|(//[^\n]*)"
+                       r"|([(){}\[\],=])|([^\s(){}\[\],='\"/]+|\S)")
+_TOKEN_KINDS = (None, "IDENT", "STRING", "STRING", "COMMENT", None, "OTHER")  # by group index
+_OPENERS = frozenset("([{")
+_CLOSERS = frozenset(")]}")
+_PAIRS = {"(": ")", "[": "]", "{": "}"}
+_CONSTANTS = {"true": True, "false": False, "none": None}  # case-insensitive DSL constants
+_MISSING = object()
+_PLACEHOLDER_RE = re.compile(r"<<([^<>]+)>>")  # dynamic variable reference
+
+# Shared defaults for the UI builders (immutable, so safe to reuse)
+_BLACK = (0, 0, 0, 255)
+_TRANSPARENT = (0, 0, 0, 0)
+_RED = (255, 0, 0)
+_EMPTY_TAGS = ()
+_STATES = ("normal", "hover", "press", "disabled")  # UIFlatButton style states
+_VALID_STYLE_KEYS = frozenset({"font_size", "font_name", "font_color", "bg", "border", "border_width"})
+_STYLE_ALIASES = {"bg_color": "bg", "border_color": "border"}  # DSL style key -> UIStyle key
+
+
+
+class UINode:
+    """
+    One parsed DSL element: its type name, its props dict and its child nodes.
+    """
+    __slots__ = ("type", "props", "children")
+
+    def __init__(self, type, props, children):
+        self.type = type
+        self.props = props
+        self.children = children
+
+    def __repr__(self):
+        return f"UINode({self.type!r}, {self.props!r}, {self.children!r})"
+
+
+def _tokenize(code: str):
+    """
+    One regex pass over the whole source, also checking bracket balance.
+    - Comments are dropped here instead of being stripped beforehand; their
+      (start, end) spans are kept so source slices can leave them out
+    - Each token is (kind, text, start, end); punctuation uses itself as kind
+    - Identifier texts are interned, so props keys share the literals used
+      by the builders and dict lookups hit on identity
+    - match[i] is the index of the bracket token paired with token i, so the
+      parser can jump over a whole group instead of counting depth
+    Raises SyntaxError on unmatched, mismatched or unclosed brackets.
+    Returns (tokens, match, comments)
+    """
+    tokens = []
+    match = []
+    comments = []
+    stack = []  # indexes of the open brackets
+    for m in _TOKEN_RE.finditer(code):
+        kind = _TOKEN_KINDS[m.lastindex]
+        if kind == "COMMENT":
+            comments.append(m.span())
+            continue
+        text = m.group()
+        if kind == "IDENT":
+            text = sys.intern(text)  # node types and prop keys hit dict lookups
+        kind = kind or text
+        j = len(tokens)
+        tokens.append((kind, text, m.start(), m.end()))
+        match.append(-1)
+        if kind in _OPENERS:
+            stack.append(j)
+        elif kind in _CLOSERS:
+            if not stack:
+                raise SyntaxError(f"Unmatched '{kind}' at position {m.start()}")
+            k = stack.pop()
+            if _PAIRS[tokens[k][0]] != kind:
+                raise SyntaxError(f"Mismatched '{tokens[k][0]}' at {tokens[k][2]} and '{kind}' at {m.start()}")
+            match[k] = j
+            match[j] = k
+    if stack:
+        raise SyntaxError(f"Unclosed '{tokens[stack[-1]][0]}' at position {tokens[stack[-1]][2]}")
+    return tokens, match, comments
 
 
 
-def interpret_ui(code: str, screen_width=800, screen_height=600) -> dict:
+def interpret_ui(code: str, screen_width=800, screen_height=600) -> tuple:
     """
     Parse DSL code with support for:
     - UI elements (buttons, labels, groups)
     - Percentages (%w/%h)
     - Style() blocks with reusable named styles
-    Returns a nested dictionary tree.
+    Returns (root UINode or None, named styles dict).
+
+    Results are memoized per (code, screen_width, screen_height); every call
+    returns a fresh copy, so callers are free to mutate it.
+    Use _interpret_ui_cached.cache_clear() to drop the cache.
+    """
+    return copy.deepcopy(_interpret_ui_cached(code, screen_width, screen_height))
+
+
+@functools.lru_cache(maxsize=128)
+def _interpret_ui_cached(code: str, screen_width, screen_height):
+    """
+    Uncached parser behind interpret_ui(). The returned tree is shared
+    between calls and must never be handed out without copying it.
     """
-    code = re.sub(r"//.*", "", code).strip()  # remove line comments
     styles = {}  # global style storage
+    named_style_props = []  # props dicts whose "style" names a style() block
+
+    # ---------- Tokenizer ----------
+    tokens, match, comments = _tokenize(code)  # raises SyntaxError on unbalanced brackets
+    n = len(tokens)
 
     # ---------- Helper functions ----------
-    def split_top_level_commas(s: str):
+    def near(i):
         """
-        Split a string by commas, but ignore commas inside (), [], {} or quotes.
-        Example: "x=1, y=(2,3)" -> ["x=1", "y=(2,3)"]
+        Short source excerpt starting at token i, for error messages.
         """
-        out, start = [], 0
-        depth_paren = depth_brack = depth_brace = 0
-        quote = None
-        i = 0
-        while i < len(s):
-            ch = s[i]
-            if quote:
-                if ch == "\\": i += 2; continue  # skip escaped chars
-                if ch == quote: quote = None    # close quote
-            else:
-                if ch in ("'", '"'): quote = ch
-                elif ch == '(': depth_paren += 1
-                elif ch == ')': depth_paren -= 1
-                elif ch == '[': depth_brack += 1
-                elif ch == ']': depth_brack -= 1
-                elif ch == '{': depth_brace += 1
-                elif ch == '}': depth_brace -= 1
-                elif ch == ',' and depth_paren==depth_brack==depth_brace==0:
-                    out.append(s[start:i].strip())  # top-level comma found
-                    start = i+1
-            i += 1
-        tail = s[start:].strip()
-        if tail: out.append(tail)
-        return out
+        return code[tokens[i][2]:tokens[i][2]+20] if i < n else ""
+
+    comment_starts = [start for start, _ in comments]
 
-    def split_kv(token: str):
+    def source(start, end):
         """
-        Split a key=value pair, ignoring '=' inside quotes.
+        Source text between offsets start and end, without // comments
+        (a value may span lines with a comment in between).
         """
-        quote = None
-        for i, ch in enumerate(token):
-            if quote:
-                if ch=="\\": continue
-                if ch==quote: quote=None
-            else:
-                if ch in ("'", '"'): quote=ch
-                elif ch=='=':
-                    key = token[:i].strip()
-                    val = token[i+1:].strip()
-                    if not key: raise ValueError(f"Invalid argument: {token}")
-                    return key, val
-        raise ValueError(f"Missing '=' in token: {token}")
+        k = bisect.bisect_left(comment_starts, start)
+        if k == len(comments) or comments[k][0] >= end:
+            return code[start:end]  # no comment inside, the usual case
+        parts = []
+        while k < len(comments) and comments[k][0] < end:
+            parts.append(code[start:comments[k][0]])
+            start = comments[k][1]
+            k += 1
+        parts.append(code[start:end])
+        return "".join(parts)
 
     def convert_value(value: str):
         """
@@ -73,46 +164,99 @@ def interpret_ui(code: str, screen_width=800, screen_height=600) -> dict:
         - %w / %h percentages -> pixel values
         - literals (int, float, str, list, dict, tuple, None, True, False)
         - fallback: keep as string
+        Dispatches on the first character, so each value only tries the
+        conversions it can match; only containers, quoted strings with
+        escapes and numbers int()/float() reject (hex, complex, ...) go
+        through ast.literal_eval.
         """
         value = value.strip()
         # handle percentages relative to screen size
         if value.endswith("%w"): return screen_width * float(value[:-2])/100
         if value.endswith("%h"): return screen_height * float(value[:-2])/100
-        try: return ast.literal_eval(value)  # try Python literal (safe eval)
-        except:
-            low = value.lower()
-            if low=="true": return True
-            if low=="false": return False
-            if low=="none": return None
-            if re.fullmatch(r"-?\d+", value): return int(value)
-            if re.fullmatch(r"-?\d+\.\d+", value): return float(value)
-            return value  # fallback: string
-
-    def parse_props(raw_props: str):
+        if not value: return value
+        first = value[0]
+        if first in "-+.0123456789":
+            try: return int(value)
+            except ValueError: pass
+            if value[-1] in "0123456789.":  # float() would also take inf/nan spellings
+                try: return float(value)
+                except ValueError: pass
+            try: return ast.literal_eval(value)  # 0x10, 0b11, 1j, -(1), ... (safe eval)
+            except Exception: pass
+        elif first in "\"'":
+            if len(value) > 1 and value[-1] == first and first not in value[1:-1] and "\\" not in value:
+                return value[1:-1]  # plain quoted string
+            try: return ast.literal_eval(value)  # escaped strings (safe eval)
+            except Exception: pass
+        elif first in "bBrRuU" and value[-1] in "\"'":
+            try: return ast.literal_eval(value)  # prefixed strings like b'x' (safe eval)
+            except Exception: pass
+        elif first in "([{":
+            try: return ast.literal_eval(value)  # containers (safe eval)
+            except Exception: pass
+        elif first in "TtFfNn":
+            const = _CONSTANTS.get(value.lower(), _MISSING)
+            if const is not _MISSING: return const
+        return value  # fallback: string
+
+    def parse_entries(i, end, by_line=False):
         """
-        Parse a raw props string like "x=10, text='Hi'" -> dict
+        Read "key=value" entries from token i up to the closing bracket at
+        token index end. Entries are split on commas, or only on new lines if
+        by_line (so "bg_color=70, 70, 70, 255" keeps the whole tuple);
+        nested brackets are skipped whole through the match table.
+        Returns a list of (key, raw_value), key being None for entries without '='.
         """
-        if not raw_props.strip(): return {}
+        entries = []
+        start = eq = None  # token indexes of the current entry
+        sep = None if by_line else ","  # token kind ending an entry
+        while True:
+            kind = tokens[i][0]
+            if start is not None and (i == end or kind == sep or
+                    (by_line and "\n" in code[tokens[i-1][3]:tokens[i][2]])):
+                # end of the current entry
+                if eq is None:
+                    entries.append((None, source(tokens[start][2], tokens[i-1][3])))
+                else:
+                    if eq == start+1 and tokens[start][0] == "IDENT":
+                        key = tokens[start][1]  # plain identifier, already interned
+                    else:
+                        key = source(tokens[start][2], tokens[eq][2]).strip()
+                    entries.append((key, source(tokens[eq][3], tokens[i-1][3]) if eq < i-1 else ""))
+                start = eq = None
+            if i == end: return entries
+            if kind != sep:
+                if start is None: start = i
+                if kind == "=" and eq is None: eq = i
+                elif kind in _OPENERS: i = match[i]  # jump to the closing bracket
+            i += 1
+
+    def parse_props(i):
+        """
+        Parse the props between "(" and ")" starting at token i, like
+        x=10, text='Hi' -> dict. Returns (props, index after ")").
+        """
+        end = match[i]
         props={}
-        for token in split_top_level_commas(raw_props):
-            if not token: continue
-            k,v = split_kv(token)
-            props[k]=convert_value(v)
-        return props
+        for key, value in parse_entries(i+1, end):
+            if key is None: raise ValueError(f"Missing '=' in token: {value}")
+            if not key: raise ValueError(f"Invalid argument: {key}={value}")
+            props[key]=convert_value(value)
+        return props, end+1
 
     # ---------- Main block parser ----------
 
-    def parse_block(block: str):
+    def parse_block(i):
         """
-        Parse a block of DSL code like:
+        Parse a block of DSL code starting at token i, like:
         Button(x=10,y=20) { Label(text="Hello") }
-        Returns a dict node with type/props/children
+        Returns (UINode, index after the block)
         """
-        block = block.strip()
-        m = re.match(r"^(\w+)\s*\((.*?)\)\s*(\{(.*)\})?$", block, re.DOTALL)
-        if not m: raise ValueError(f"Invalid syntax: {block}")
-        node_type, raw_props, _, raw_children = m.groups()
-        props = parse_props(raw_props)
+        if i+1 >= n or tokens[i][0] != "IDENT" or tokens[i+1][0] != "(":
+            raise ValueError(f"Invalid syntax: {near(i)!r}")
+        node_type = tokens[i][1]
+        props, i = parse_props(i+1)
+        has_body = i < n and tokens[i][0] == "{"
 
         # ---------- STYLE HANDLING ----------
         if node_type.lower() == "style":
@@ -121,137 +265,60 @@ def interpret_ui(code: str, screen_width=800, screen_height=600) -> dict:
                 raise ValueError("Style() must have a 'name' parameter")
             style_name = props.pop("name")
             style_props = {}
-            if raw_children:
-                # parse child lines as style properties
-                for line in raw_children.strip().splitlines():
-                    line = line.strip()
-                    if not line or line.startswith("//") or line.startswith("}") or line.startswith("{"): 
-                        continue
-                    if '=' not in line:
-                        continue
-                    key, value = line.split('=', 1)
-                    style_props[key.strip()] = convert_value(value.strip())
+            if has_body:
+                # parse body lines as style properties, lines without '=' are ignored
+                end = match[i]
+                for key, value in parse_entries(i+1, end, by_line=True):
+                    if key:
+                        style_props[key] = convert_value(value)
+                i = end+1
             style_props.update(props)
             styles[style_name] = style_props
-            return None  # style nodes don't become UI elements
+            return None, i  # style nodes don't become UI elements
 
         # ---------- CHILD NODE PARSING ----------
         children = []
-        if raw_children:
-            # manually parse nested children
-            s = raw_children.strip()
-            i=0
-            while i < len(s):
-                while i<len(s) and s[i].isspace(): i+=1
-                if i>=len(s): break
-                start=i
-                while i<len(s) and (s[i].isalnum() or s[i]=='_'): i+=1
-                while i<len(s) and s[i].isspace(): i+=1
-                if i>=len(s) or s[i]!='(': raise ValueError(f"Expected '(' after child near: {s[i:i+20]!r}")
-                # find matching parenthesis + braces
-                depth=0; quote=None
-                while i<len(s):
-                    ch=s[i]
-                    if quote:
-                        if ch=="\\": i+=2; continue
-                        if ch==quote: quote=None
-                    else:
-                        if ch in ("'", '"'): quote=ch
-                        elif ch=='(': depth+=1
-                        elif ch==')': depth-=1
-                        if depth==0: i+=1; break
-                    i+=1
-                while i<len(s) and s[i].isspace(): i+=1
-                if i<len(s) and s[i]=='{':
-                    depth=0; quote=None
-                    while i<len(s):
-                        ch=s[i]
-                        if quote:
-                            if ch=="\\": i+=2; continue
-                            if ch==quote: quote=None
-                        else:
-                            if ch in ("'", '"'): quote=ch
-                            elif ch=='{': depth+=1
-                            elif ch=='}': depth-=1
-                            if depth==0: i+=1; break
-                        i+=1
-                child_block = s[start:i].strip()
-                if child_block:
-                    child = parse_block(child_block)
-                    if child: children.append(child)
+        if has_body:
+            end = match[i]
+            i += 1
+            while i < end:
+                if tokens[i][0] != "IDENT" or tokens[i+1][0] != "(":
+                    raise ValueError(f"Expected '(' after child near: {near(i)!r}")
+                child, i = parse_block(i)
+                if child: children.append(child)
+            i = end+1
 
         # ---------- STYLE APPLICATION ----------
         style_ref = props.pop("style_name", None)
         if style_ref and style_ref in styles:
             for k,v in styles[style_ref].items():
                 props.setdefault(k,v)
+        if isinstance(props.get("style"), str):
+            named_style_props.append(props)  # resolved once the whole file is parsed
 
-        return {"type": node_type, "props": props, "children": children}
+        return UINode(node_type, props, children), i
 
     # ---------- TOP LEVEL MULTI-BLOCK HANDLING ----------
     # Allows multiple root nodes, wrapped into a container if needed
-    blocks = []
+    roots = []
     i = 0
-    code = code.strip()
-
-    while i < len(code):
-        # find block start and end manually (similar logic as child parsing)
-        while i < len(code) and code[i].isspace(): i += 1
-        if i >= len(code): break
-
-        start = i
-        while i < len(code) and (code[i].isalnum() or code[i] == '_'): i += 1
-        while i < len(code) and code[i].isspace(): i += 1
-        if i >= len(code) or code[i] != '(': break
-
-        depth = 0
-        quote = None
-        paren_depth = 0
-        while i < len(code):
-            ch = code[i]
-            if quote:
-                if ch == "\\" and i + 1 < len(code):
-                    i += 2
-                    continue
-                if ch == quote:
-                    quote = None
-            else:
-                if ch in ("'", '"'):
-                    quote = ch
-                elif ch == '(':
-                    paren_depth += 1
-                elif ch == ')':
-                    paren_depth -= 1
-                elif ch == '{' and paren_depth == 0:
-                    depth += 1
-                elif ch == '}' and paren_depth == 0:
-                    depth -= 1
-                    if depth == 0:
-                        i += 1
-                        break
-            i += 1
-
-        block_text = code[start:i].strip()
-        if block_text:
-            blocks.append(block_text)
+    while i < n:
+        # stop at the first thing that doesn't look like "name(...)"
+        if tokens[i][0] != "IDENT" or i+1 >= n or tokens[i+1][0] != "(": break
+        parsed, i = parse_block(i)
+        if parsed is not None: roots.append(parsed)
 
     # ---------- BUILD MAIN TREE ----------
-    main_tree = None
-    for block_text in blocks:
-        parsed = parse_block(block_text)
-        if parsed is not None:
-            if main_tree is None:
-                main_tree = parsed
-            else:
-                # if multiple non-style root blocks exist, wrap in container
-                if main_tree.get("type") != "container":
-                    main_tree = {
-                        "type": "container", 
-                        "props": {},
-                        "children": [main_tree, parsed]
-                    }
-                else:
-                    main_tree["children"].append(parsed)
+    # if multiple non-style root blocks exist, wrap them in one container
+    if len(roots) > 1: main_tree = UINode("container", {}, roots)
+    else: main_tree = roots[0] if roots else None
+
+    # ---------- NAMED STYLE RESOLUTION ----------
+    # style="name" becomes a copy of the style's dict, so builders only look
+    # up names defined elsewhere; done last so a style may be declared after its first use
+    for props in named_style_props:
+        if props["style"] in styles:
+            props["style"] = styles[props["style"]].copy()
 
     return main_tree, styles
 
@@ -263,339 +330,485 @@ def interpret_ui(code: str, screen_width=800, screen_height=600) -> dict:
 
 
 
-def build_ui_from_tree(tree: dict, obj_list: dict, styles=None, parent_props=None, dynamic_refs=None):
+def _freeze(value):
+    """
+    Turn a style value into something hashable (lists/dicts -> tuples).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _make_button_style(style_dict):
+    """
+    Convert a flat DSL style dict (None for the default style) into the
+    {state: UIStyle} mapping used by UIFlatButton.
+    Results are memoized, so buttons sharing a style share the same mapping.
+    """
+    if style_dict is None:
+        cache_key = None
+        valid_props = {
+            #"font_size": 14,
+            #"font_name": ("Arial",),
+            #"font_color": (255, 255, 255, 255),
+            #"bg": (70, 70, 70, 255),
+            #"border": (100, 100, 100, 255),
+            #"border_width": 2
+        }
+    else:
+        # Rename DSL keys and keep only valid UIFlatButton.UIStyle keys in one pass
+        valid_props = {}
+        for key, value in style_dict.items():
+            key = _STYLE_ALIASES.get(key, key)
+            if key in _VALID_STYLE_KEYS:
+                valid_props[key] = value
+
+        # Provide defaults
+        valid_props.setdefault("font_name", ("Arial",))
+        valid_props.setdefault("border_width", 2)
+        cache_key = _freeze(valid_props)
+
+    button_style = _STYLE_CACHE.get(cache_key)
+    if button_style is None:
+        # Create a UIStyle for all button states
+        style = arcade.gui.UIFlatButton.UIStyle(**valid_props)
+        button_style = _STYLE_CACHE[cache_key] = {state: style for state in _STATES}
+    return button_style
+
+
+# ---------- UI ELEMENT BUILDERS ----------
+# Each builder takes a node type and its merged props and returns (widget class, kwargs)
+
+def _apply_anchor(kwargs, props):
+    """
+    Center adjustment if anchor=center: shift kwargs x/y by half the size.
+    Runs once per node in compile_tree(), where inherited anchors are known.
+    """
+    if props.get("anchor") == "center":
+        kwargs["x"] -= kwargs["width"] // 2
+        kwargs["y"] -= kwargs["height"] // 2
+
+
+# node type -> (arcade widget class, {kwarg: (prop name, default)}, apply anchor centering)
+_NODE_SPECS = {
+    "label": (arcade.gui.UILabel, {
+        "text": ("text", ""),
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 0),
+        "height": ("height", 0),
+        "font_name": ("font_name", "Arial"),
+        "font_size": ("font_size", 14),
+        "text_color": ("text_color", _BLACK),
+        "bold": ("bold", False),
+        "italic": ("italic", False),
+        "align": ("anchor", "center"),
+        "multiline": ("multiline", False),
+    }, True),
+    "button": (arcade.gui.UIFlatButton, {
+        "text": ("text", ""),
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 100),
+        "height": ("height", 100),
+    }, True),
+    "input_text": (arcade.gui.UIInputText, {
+        "text": ("text", ""),
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 200),
+        "height": ("height", 30),
+        "font_name": ("font_name", "Arial"),
+        "font_size": ("font_size", 14),
+        "text_color": ("text_color", _BLACK),
+        "multiline": ("multiline", False),
+    }, True),
+    "text_area": (arcade.gui.UITextArea, {
+        "text": ("text", ""),
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 300),
+        "height": ("height", 100),
+        "font_name": ("font_name", "Arial"),
+        "font_size": ("font_size", 12),
+        "text_color": ("text_color", _BLACK),
+        "multiline": ("multiline", True),
+        "scroll_speed": ("scroll_speed", 10.0),
+    }, True),
+    "space": (arcade.gui.UISpace, {  # invisible spacing widget
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 100),
+        "height": ("height", 100),
+        "color": ("color", _TRANSPARENT),
+    }, True),
+    "dummy": (arcade.gui.UIDummy, {  # placeholder widget
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 100),
+        "height": ("height", 100),
+        "color": ("color", _RED),
+    }, False),
+    "sprite_widget": (arcade.gui.UISpriteWidget, {  # sprite container widget
+        "sprite": ("sprite", None),
+        "x": ("x", 0),
+        "y": ("y", 0),
+        "width": ("width", 64),
+        "height": ("height", 64),
+    }, False),
+}
+
+
+# _NODE_SPECS as (default kwargs, {prop name: kwarg}, center) for _widget_kwargs()
+_SPEC_LOOKUPS = {
+    node_type: ({kwarg: default for kwarg, (_, default) in spec.items()},
+                {prop: kwarg for kwarg, (prop, _) in spec.items()}, center)
+    for node_type, (_, spec, center) in _NODE_SPECS.items()
+}
+
+
+def _widget_kwargs(node_type, props):
+    """
+    Widget keyword arguments for node_type, read from props through _NODE_SPECS.
+    Starts from a copy of the defaults and only visits the props the node
+    actually sets (key intersection runs in C).
+    """
+    defaults, kwarg_of, center = _SPEC_LOOKUPS[node_type]
+    kwargs = defaults.copy()
+    for prop in props.keys() & kwarg_of.keys():
+        kwargs[kwarg_of[prop]] = props[prop]
+    if center: _apply_anchor(kwargs, props)
+    return kwargs
+
+
+def _build_widget(node_type, props, styles):
+    # Build any widget fully described by its _NODE_SPECS entry
+    return _NODE_SPECS[node_type][0], _widget_kwargs(node_type, props)
+
+
+def _build_button(node_type, props, styles):
+    # Build a UIFlatButton
+    button_kwargs = _widget_kwargs(node_type, props)
+
+    # ---------- STYLE HANDLING ----------
+    style = props.get("style", None)
+    if isinstance(style, dict):
+        # state-based style dictionary
+        has_states = any(key in _STATES for key in style.keys())
+        if not has_states:
+            # convert flat dict -> UIStyle for all states
+            button_kwargs["style"] = _make_button_style(style)
+
+    elif isinstance(style, str):
+        # Named style the file itself did not define (interpret_ui already
+        # inlined those): look it up in the styles given to compile_tree,
+        # e.g. merged from a shared style file; unknown names keep arcade's default
+        if style in styles:
+            button_kwargs["style"] = _make_button_style(styles[style])
+
+    # Default style if none provided
+    else:
+        button_kwargs["style"] = _make_button_style(None)
+
+    return arcade.gui.UIFlatButton, button_kwargs
+
+
+_BUILDERS = {node_type: _build_widget for node_type in _NODE_SPECS}
+_BUILDERS["button"] = _build_button  # buttons also convert their style
+_CONTAINERS = frozenset({"group", "box_layout", "anchor_layout", "container"})  # pass props to children only
+
+
+def _walk_tree(tree: UINode, styles, parent_props):
+    """
+    Walk a parsed DSL tree depth-first in document order and yield
+    (widget class, kwargs, node props, name, tags, is root) for every widget.
+    Shared by compile_tree() and build_ui_from_tree().
+    """
+    styles = styles or {}
+
+    # Explicit stack; children are pushed in reverse so objects are still
+    # created in document order
+    stack = [(tree, parent_props or {})]
+    while stack:
+        node, parent_props = stack.pop()
+        # Start with inherited properties, then update with current node's props;
+        # a flat dict keeps the builders' many .get() misses to one lookup each
+        props = dict(parent_props)
+        props.update(node.props)
+
+        node_type = node.type
+
+        # ---------- CREATE SPECIFIC UI ELEMENTS ----------
+        builder = _BUILDERS.get(node_type)
+        if builder:
+            widget_class, kwargs = builder(node_type, props, styles)
+            yield widget_class, kwargs, node.props, props.get("name", ""), props.get("tags", _EMPTY_TAGS), node is tree
+        elif node_type not in _CONTAINERS:
+            raise ValueError(f"Unknown UI element type: {node_type}")
+        # Container nodes: only pass props to children; no direct object
+
+        if node.children:
+            stack.extend((child, props) for child in reversed(node.children))
+
+
+def _index_refs(dynamic_refs):
+    """
+    Map id() of each ref's props dict to the indexes of its refs, so each
+    created object finds its refs in one lookup instead of comparing every ref.
+    """
+    refs_by_props = {}
+    for i, ref in enumerate(dynamic_refs):
+        refs_by_props.setdefault(id(ref[0]), []).append(i)
+    return refs_by_props
+
+
+def compile_tree(tree: UINode, styles=None, parent_props=None):
     """
-    Recursively create Arcade UI objects from a parsed DSL tree.
+    Walk a parsed DSL tree once and return a builder for its UI objects.
+
+    All prop lookups, style conversion and anchor centering happen here;
+    the returned build(obj_list, dynamic_refs) only instantiates the
+    prepared widgets, so keep it around to rebuild the same screen cheaply.
+    For a single build, build_ui_from_tree() is faster.
+    The tree must already be linked with set_dsl_keys().
+
+    build() leaves dynamic_refs untouched and returns (root object or None,
+    refs bound to the new objects), so every rebuild can start from the
+    same refs returned by set_dsl_keys().
 
     Args:
-        tree (dict): Node from interpret_ui output (type, props, children)
-        obj_list (dict): Dictionary storing created objects; -1 key contains dynamic refs
-        styles (dict): Named styles from DSL parsing
+        tree (UINode): Root node from interpret_ui output
+        styles (dict): Named styles for style="name" props interpret_ui could not resolve from the same file
         parent_props (dict): Inherited props from parent container
-        dynamic_refs (list): List of references to dynamic variables for updates
     """
-    parent_props = parent_props or {}
-    styles = styles or {}
-    # Start with inherited properties, then update with current node's props
-    props = parent_props.copy()
-    props.update(tree.get("props", {}))
-
-    node_type = tree.get("type")
-    children = tree.get("children", [])
-
-    created_obj = None  # store the actual Arcade UI object
-
-    # ---------- CREATE SPECIFIC UI ELEMENTS ----------
-    if node_type == "label":
-        # Build a UILabel with all the provided properties
-        label_kwargs = {
-            "text": props.get("text", ""),
-            "x": props.get("x", 0),
-            "y": props.get("y", 0),
-            "width": props.get("width", 0),
-            "height": props.get("height", 0),
-            "font_name": props.get("font_name", "Arial"),
-            "font_size": props.get("font_size", 14),
-            "text_color": props.get("text_color", (0,0,0,255)),
-            "bold": props.get("bold", False),
-            "italic": props.get("italic", False),
-            "align": props.get("anchor", "center"),
-            "multiline": props.get("multiline", False)
-        }
+    steps = []  # (widget factory, node props, name, tags) in creation order
+    has_root = False
+    for widget_class, kwargs, node_props, name, tags, is_root in _walk_tree(tree, styles, parent_props):
+        steps.append((functools.partial(widget_class, **kwargs), node_props, name, tags))
+        if is_root: has_root = True
 
-        # Center adjustment if anchor=center
-        if "anchor" in props:
-            if props["anchor"] == "center":
-                label_kwargs["x"] -= label_kwargs["width"] // 2
-                label_kwargs["y"] -= label_kwargs["height"] // 2
-
-        created_obj = arcade.gui.UILabel(**label_kwargs)
-
-    elif node_type == "button":
-        # Build a UIFlatButton
-        button_kwargs = {
-            "text": props.get("text", ""),
-            "x": props.get("x", 0),
-            "y": props.get("y", 0),
-            "width": props.get("width", 100),
-            "height": props.get("height", 100),
-        }
+    def build(obj_list: list, dynamic_refs: list):
+        created = []
+        bound_refs = list(dynamic_refs)  # the caller's refs stay usable for the next build
+        refs_by_props = _index_refs(dynamic_refs)
 
-        # Center adjustment
-        if "anchor" in props:
-            if props["anchor"] == "center":
-                button_kwargs["x"] -= button_kwargs["width"] // 2
-                button_kwargs["y"] -= button_kwargs["height"] // 2
+        for factory, node_props, name, tags in steps:
+            created_obj = factory()
+            created.append(created_obj)
 
-        # ---------- STYLE HANDLING ----------
-        style = props.get("style", None)
-        if isinstance(style, dict):
-            # state-based style dictionary
-            has_states = any(key in ["normal", "hover", "press", "disabled"] for key in style.keys())
-            if not has_states:
-                # convert flat dict -> UIStyle for all states
-                arcade_props = {}
-                for key, value in style.items():
-                    if key == "bg_color":
-                        arcade_props["bg"] = value
-                    elif key == "border_color":
-                        arcade_props["border"] = value
-                    else:
-                        arcade_props[key] = value
-
-                # Provide defaults
-                arcade_props.setdefault("font_name", ("Arial",))
-                arcade_props.setdefault("border_width", 2)
-
-                # Filter only valid UIFlatButton.UIStyle keys
-                valid_keys = {"font_size", "font_name", "font_color", "bg", "border", "border_width"}
-                valid_props = {k:v for k,v in arcade_props.items() if k in valid_keys}
-
-                # Create a UIStyle for all button states
-                button_style = arcade.gui.UIFlatButton.UIStyle(**valid_props)
-                button_kwargs["style"] = {state: button_style for state in ["normal","hover","press","disabled"]}
-        elif isinstance(style, str):
-            # Named style: look up in DSL styles
-            if style in styles:
-                named_style = styles[style]
-                arcade_props = {}
-                for key, value in named_style.items():
-                    if key == "bg_color":
-                        arcade_props["bg"] = value
-                    elif key == "border_color":
-                        arcade_props["border"] = value
-                    else:
-                        arcade_props[key] = value
-                arcade_props.setdefault("font_name", ("Arial",))
-                arcade_props.setdefault("border_width", 2)
-                valid_keys = {"font_size", "font_name", "font_color", "bg", "border", "border_width"}
-                valid_props = {k:v for k,v in arcade_props.items() if k in valid_keys}
-                button_style = arcade.gui.UIFlatButton.UIStyle(**valid_props)
-                button_kwargs["style"] = {state: button_style for state in ["normal","hover","press","disabled"]}
-
-        # Default style if none provided
-        else:
-            normal_style = arcade.gui.UIFlatButton.UIStyle(
-                #font_size=14,
-                #font_name=("Arial",),
-                #font_color=(255, 255, 255, 255),
-                #bg=(70, 70, 70, 255),
-                #border=(100, 100, 100, 255),
-                #border_width=2
-            )
-            button_kwargs["style"] = {state: normal_style for state in ["normal","hover","press","disabled"]}
-
-        created_obj = arcade.gui.UIFlatButton(**button_kwargs)
-
-    elif node_type == "input_text":
-        # Build a UIInputText
-        input_text_kwargs = {
-            "text": props.get("text", ""),
-            "x": props.get("x", 0),
-            "y": props.get("y", 0),
-            "width": props.get("width", 200),
-            "height": props.get("height", 30),
-            "font_name": props.get("font_name", "Arial"),
-            "font_size": props.get("font_size", 14),
-            "text_color": props.get("text_color", (0, 0, 0, 255)),
-            "multiline": props.get("multiline", False)
-        }
+            # ---------- DYNAMIC VARIABLE REFS ----------
+            # Point the dynamic reference at the actual UI object
+            for i in refs_by_props.get(id(node_props), ()):
+                target, key, variables, var_name = dynamic_refs[i]
+                bound_refs[i] = (created_obj, key, variables, var_name)
 
-        if "anchor" in props:
-            if props["anchor"] == "center":
-                input_text_kwargs["x"] -= input_text_kwargs["width"] // 2
-                input_text_kwargs["y"] -= input_text_kwargs["height"] // 2
-
-        created_obj = arcade.gui.UIInputText(**input_text_kwargs)
-
-    elif node_type == "text_area":
-        # Build a UITextArea
-        text_area_kwargs = {
-            "text":props.get("text", ""),
-            "x":props.get("x", 0),
-            "y":props.get("y", 0),
-            "width":props.get("width", 300),
-            "height":props.get("height", 100),
-            "font_name":props.get("font_name", "Arial"),
-            "font_size":props.get("font_size", 12),
-            "text_color":props.get("text_color", (0, 0, 0, 255)),
-            "multiline":props.get("multiline", True),
-            "scroll_speed":props.get("scroll_speed", 10.0)
-        }
+            # Store created object in obj_list with name/tags
+            obj_list.append([created_obj, name, tags])
 
-        if "anchor" in props:
-            if props["anchor"] == "center":
-                text_area_kwargs["x"] -= text_area_kwargs["width"] // 2
-                text_area_kwargs["y"] -= text_area_kwargs["height"] // 2
-
-        created_obj = arcade.gui.UITextArea(**text_area_kwargs)
-
-    elif node_type == "space":
-        # Invisible spacing widget
-        space_kwargs = {
-            "x":props.get("x", 0),
-            "y":props.get("y", 0),
-            "width":props.get("width", 100),
-            "height":props.get("height", 100),
-            "color":props.get("color", (0, 0, 0, 0))
-        }
+        return (created[0] if has_root else None), bound_refs
 
-        if "anchor" in props:
-            if props["anchor"] == "center":
-                space_kwargs["x"] -= space_kwargs["width"] // 2
-                space_kwargs["y"] -= space_kwargs["height"] // 2
-
-        created_obj = arcade.gui.UISpace(**space_kwargs)
-
-    elif node_type == "dummy":
-        # Placeholder/dummy widget
-        dummy_kwargs = {
-            "x":props.get("x", 0),
-            "y":props.get("y", 0),
-            "width":props.get("width", 100),
-            "height":props.get("height", 100),
-            "color":props.get("color", (255, 0, 0))
-        }
-        created_obj = arcade.gui.UIDummy(**dummy_kwargs)
-
-    elif node_type == "sprite_widget":
-        # Sprite container widget
-        sprite_widget_kwargs = {
-            "sprite":props.get("sprite"),
-            "x":props.get("x", 0),
-            "y":props.get("y", 0),
-            "width":props.get("width", 64),
-            "height":props.get("height", 64)
-        }
-        created_obj = arcade.gui.UISpriteWidget(**sprite_widget_kwargs)
+    return build
 
-    elif node_type in ["group", "box_layout", "anchor_layout", "container"]:
-        # Container nodes: only pass props to children; no direct object
-        pass
-    else:
-        raise ValueError(f"Unknown UI element type: {node_type}")
 
-    # ---------- DYNAMIC VARIABLE REFS ----------
-    try:
-        # Ensure obj_list[-1] contains dynamic references
-        temp = obj_list[-1]
-        del temp
-    except:
-        obj_list[-1] = dynamic_refs
+def build_ui_from_tree(tree: UINode, obj_list: list, dynamic_refs: list, styles=None, parent_props=None):
+    """
+    Create Arcade UI objects from a parsed DSL tree in a single pass.
+    Rebinds dynamic_refs in place and returns the root object or None;
+    use compile_tree() instead to build the same screen several times.
 
-    # Update dynamic reference to point to actual UI object
-    for ref in obj_list[-1]:
-        if ref["target_dict"] == tree["props"]:
-            ref["target_dict"] = created_obj
+    Args:
+        tree (UINode): Root node from interpret_ui output
+        obj_list (list): Receives [object, name, tags] for every created object
+        dynamic_refs (list): References returned by set_dsl_keys(), pointed at the created objects
+        styles (dict): Named styles from DSL parsing, e.g. merged from several files
+        parent_props (dict): Inherited props from parent container
+    """
+    root = None
+    refs_by_props = _index_refs(dynamic_refs)
+    for widget_class, kwargs, node_props, name, tags, is_root in _walk_tree(tree, styles, parent_props):
+        created_obj = widget_class(**kwargs)
+        if is_root: root = created_obj
 
-    # Store created object in obj_list with name/tags
-    if created_obj:
-        obj_list[len(obj_list)-1] = [created_obj, props.get("name", ""), props.get("tags", [])]
+        # ---------- DYNAMIC VARIABLE REFS ----------
+        # Point the dynamic reference at the actual UI object
+        for i in refs_by_props.get(id(node_props), ()):
+            target, key, variables, var_name = dynamic_refs[i]
+            dynamic_refs[i] = (created_obj, key, variables, var_name)
 
-    # ---------- RECURSIVE CHILD CREATION ----------
-    for child in children:
-        build_ui_from_tree(child, obj_list, styles, parent_props=props)
+        # Store created object in obj_list with name/tags
+        obj_list.append([created_obj, name, tags])
 
-    return created_obj
+    return root
 
 
 
 
 
 
-def load_dsl_files(folder: str = "dsl") -> dict:
+def _read_file(path: str) -> str:
     """
-    Scan folder for .dsl files, return {filename: file_content}
+    Read a whole UTF-8 text file.
+    Read as bytes and decoded in one go, skipping the text-mode wrapper;
+    \r\n and lone \r line ends are turned into \n like text mode does.
+    """
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8")
+    if "\r" in text: text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def iter_dsl_files(folder: str = "dsl"):
+    """
+    Scan folder for .dsl files, return an iterator of (filename, file_content)
+    in directory order
+    Files whose mtime did not change since the last call are not read again,
+    the others are read concurrently in the background, so the caller can
+    already parse a file while the following ones are still being read.
+    The folder is checked and scanned right away, so FileNotFoundError is
+    raised by this call, not on the first next().
     """
-    dsl_dict = {}
     folder = os.path.abspath(folder)  # absolute path
 
     if not os.path.exists(folder):
         raise FileNotFoundError(f"Folder not found: {folder}")
 
-    for filename in os.listdir(folder):
-        if filename.endswith(".dsl"):
-            key = os.path.splitext(filename)[0]  # remove extension
-            file_path = os.path.join(folder, filename)
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            dsl_dict[key] = content
+    with os.scandir(folder) as it:
+        entries = [e for e in it if e.is_file() and e.name.endswith(".dsl")]
+
+    files = []  # (key, path, mtime, cached content or _MISSING)
+    to_read = []  # paths of new or modified files
+    for entry in entries:
+        key = os.path.splitext(entry.name)[0]  # remove extension
+        mtime = entry.stat().st_mtime_ns
+        cached = _DSL_FILE_CACHE.get(entry.path)
+        if cached and cached[0] == mtime:
+            files.append((key, entry.path, mtime, cached[1]))  # unchanged since last load
+        else:
+            files.append((key, entry.path, mtime, _MISSING))
+            to_read.append(entry.path)
+
+    if not to_read:
+        return ((key, content) for key, _, _, content in files)
 
-    return dsl_dict
+    def read_all():
+        # file reads release the GIL, so threads overlap the I/O
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(to_read))) as ex:
+            contents = ex.map(_read_file, to_read)  # results come back in to_read order
+            for key, path, mtime, content in files:
+                if content is _MISSING:
+                    content = next(contents)
+                    _DSL_FILE_CACHE[path] = (mtime, content)
+                yield key, content
+
+    return read_all()
+
+
+def load_dsl_files(folder: str = "dsl") -> dict:
+    """
+    Scan folder for .dsl files, return {filename: file_content}
+    See iter_dsl_files() to start parsing before every file is read.
+    """
+    return dict(iter_dsl_files(folder))
 
 
 def validate_dsl(text):
     """
     Simple syntax check for balanced (), {}, []
     Raises SyntaxError if unmatched
+    Runs the parser's tokenizer, so brackets inside strings and comments
+    are ignored; interpret_ui() performs the same check by itself.
     """
-    stack = []
-    for i, ch in enumerate(text):
-        if ch in "({[":
-            stack.append((ch, i))
-        elif ch in ")}]":
-            if not stack:
-                raise SyntaxError(f"Unmatched '{ch}' at position {i}")
-            opening, pos = stack.pop()
-            if (opening, ch) not in [("(", ")"), ("{", "}"), ("[", "]")]:
-                raise SyntaxError(f"Mismatched '{opening}' at {pos} and '{ch}' at {i}")
-
-    if stack:
-        raise SyntaxError(f"Unclosed '{stack[-1][0]}' at position {stack[-1][1]}")
+    _tokenize(text)
 
 
 def set_dsl_keys(parsed_code, variables:dict):
     """
     Link dynamic variables to DSL parsed tree.
-    - Stores dynamic_vars in parsed_code
-    - Stores _dynamic_refs for future updates
+    - Replaces "<<name>>" placeholders with the variable values
+    - Returns the list of dynamic refs for build_ui_from_tree() and update_ui(),
+      each a (target, key, variables, var_name) tuple
     """
-    parsed_code["dynamic_vars"] = variables
-    parsed_code["_dynamic_refs"] = []
-
-    def iterate_dict(parsed_code, d, v_key, v_value, variables):
-        # Traverse nested dicts/lists
-        for key, value in list(d.items()):
+    dynamic_refs = []
+    if not variables:
+        return dynamic_refs  # nothing to link, skip the walk
+
+    # Single breadth-first pass over nodes and nested dicts/lists, whatever the number of variables
+    queue = collections.deque([parsed_code])
+    while queue:
+        d = queue.popleft()
+        if isinstance(d, UINode):
+            queue.append(d.props)
+            queue.extend(d.children)
+            continue
+        for key, value in d.items():
             if isinstance(value, dict):
-                iterate_dict(parsed_code, d[key], v_key, v_value, variables)
+                queue.append(value)
             elif isinstance(value, list):
-                for i, item in enumerate(value):
-                    if isinstance(item, dict):
-                        iterate_dict(parsed_code, item, v_key, v_value, variables)
-            elif isinstance(value, str):
-                if "<<" in value and ">>" in value:
-                    var_name = value.replace("<<", "").replace(">>", "")
-                    if v_key == var_name:
-                        # Replace placeholder with actual variable value
-                        d[key] = variables[v_key]
-                        # Save reference for later dynamic updates
-                        parsed_code["_dynamic_refs"].append({
-                            "target_dict": d,
-                            "target_key": key,
-                            "var_name": v_key,
-                            "variables_ref": variables
-                        })
-
-    # Iterate over all dynamic variables
-    for key, value in variables.items():
-        iterate_dict(parsed_code, parsed_code, key, value, variables)
-    return parsed_code
-
-
-def update_ui(data):
+                queue.extend(item for item in value if isinstance(item, dict))
+            elif isinstance(value, str) and "<<" in value:
+                m = _PLACEHOLDER_RE.fullmatch(value)
+                if m and m.group(1) in variables:
+                    var_name = m.group(1)
+                    # Replace placeholder with actual variable value
+                    d[key] = variables[var_name]
+                    # Save reference for later dynamic updates
+                    dynamic_refs.append((d, key, variables, var_name))
+
+    return dynamic_refs
+
+
+def compile_updates(dynamic_refs):
+    """
+    Return an update() function refreshing every dynamic ref.
+    - Refs still pointing at a props dict (no widget was built for them)
+      are updated by item assignment, the others with setattr()
+    - Refs are sorted once here, so keep update() around and call it every
+      frame instead of update_ui(); call compile_updates() again after a rebuild
+      (opt-in: update_ui() itself stays a single direct loop)
+    """
+    item_refs = []
+    attr_refs = []
+    for target, key, variables, var_name in dynamic_refs:
+        (item_refs if type(target) is dict else attr_refs).append((target, key, variables, var_name))
+
+    def update():
+        for target, key, variables, var_name in item_refs:
+            target[key] = variables[var_name]
+        for target, key, variables, var_name in attr_refs:
+            setattr(target, key, variables[var_name])
+
+    return update
+
+
+def update_ui(dynamic_refs):
     """
     Updates all UI objects that have dynamic variables.
     Called every frame or when variables change.
+    Refs still pointing at a props dict are updated by item assignment;
+    see compile_updates() to sort the refs once instead of every call.
     """
-    for i in data["DSLRaw"][data["currentUI"]][-1]:
-        setattr(i["target_dict"], i["target_key"], i["variables_ref"][i["var_name"]])
+    for target, key, variables, var_name in dynamic_refs:
+        if type(target) is dict: target[key] = variables[var_name]  # plain props dicts from the parser
+        else: setattr(target, key, variables[var_name])
 
 
 def load_ddsl_files(folder: str = "dsl") -> dict:
     """
     Load main.ddsl which contains the dynamic variables in JSON format.
     Returns a dict of variable_name: value
+    The file is only parsed again once its mtime changes; every call still
+    returns a deep copy, since callers update the values in place.
     """
-    with open(f"{folder}/main.ddsl", "r") as f:
-        json_data = json.load(f)
-    return json_data
+    path = os.path.join(folder, "main.ddsl")
+    mtime = os.stat(path).st_mtime_ns
+    cached = _DDSL_CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return copy.deepcopy(cached[1])
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    json_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    _DDSL_CACHE[path] = (mtime, json_data)
+    return copy.deepcopy(json_data)